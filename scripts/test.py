@@ -5,7 +5,7 @@ from quant_research.data_portal.hl_ctxs_to_parquet import split_asset_ctxs_by_co
 RAW_DIR = Path("data/hl_asset_ctxs_raw")
 PARQUET_DIR = Path("data/hl_assets_ctxs_parquet")
 PARQUET_DIR.mkdir(parents=True, exist_ok=True)
-COIN_DIR = Path("data/hl_assets_ctxs_by_coin")
+COIN_DIR = Path("data/hl_assets_ctxs_by_coin_month")
 COIN_DIR.mkdir(parents=True, exist_ok=True)
 
 summary = split_asset_ctxs_by_coin_month(
@@ -13,7 +13,7 @@ summary = split_asset_ctxs_by_coin_month(
     out_dir=COIN_DIR,
     file_glob="*.parquet",  # matches 20240101.parquet etc.
     compression="zstd",
-    row_group_size=1_000_000,
+    row_group_size=100_000,
     overwrite=True,
 )
 
@@ -5,16 +5,28 @@ Fetches historical CLOSE and VOLUME via ek.get_timeseries (chunked)
 and industry classification via ek.get_data.
 """
 
+import functools
+import hashlib
 import os
+import threading
 import pandas as pd
 import eikon as ek
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime, date, timedelta
+from pathlib import Path
 
 # Load .env if present
 load_dotenv()
 ek.set_app_key(os.getenv("EIKON_APP_KEY"))
 
+# Cap on concurrent get_timeseries requests across all threads (rate limits)
+EIKON_MAX_CONCURRENT = int(os.getenv("EIKON_MAX_CONCURRENT", "8"))
+_EIKON_SLOTS = threading.BoundedSemaphore(EIKON_MAX_CONCURRENT)
+
+# Raw get_timeseries responses, one parquet per chunk (resumable ingest)
+CHUNK_CACHE_DIR = Path(__file__).resolve().parents[3] / "data" / "raw" / "eikon_chunks"
+
 
 def _to_datetime(x):
     """Convert string/date/datetime to datetime.datetime."""
@@ -27,7 +39,13 @@ def _to_datetime(x):
     return datetime.strptime(str(x), "%Y-%m-%d")  # strict ISO format
 
 
-def _resolve_dates(start, end):
+@functools.lru_cache(maxsize=128)
+def _parse_date_str(x):
+    """Parse a date string once; datetimes are immutable so results are shared."""
+    return pd.to_datetime(x).to_pydatetime()
+
+
+def resolve_dates(start, end):
     """
     Accepts str | datetime | date for start/end.
     Also accepts an integer (days) or timedelta for `end` meaning start + end.
@@ -41,7 +59,7 @@ def _resolve_dates(start, end):
             return datetime(x.year, x.month, x.day)
         if isinstance(x, str):
             # Allow 'YYYY-MM-DD' or full ISO strings
-            return pd.to_datetime(x).to_pydatetime()
+            return _parse_date_str(x)
         if isinstance(x, (int, float)):
             # Interpret as days offset
             return None, int(x)
@@ -73,11 +91,99 @@ def _resolve_dates(start, end):
     return s, e
 
 
+def _chunk_cache_path(tickers, field, start, end, interval):
+    """
+    Build path for a cached raw chunk, keyed by the request parameters.
+    Example: data/raw/eikon_chunks/eikon_<md5>.parquet
+    """
+    key = repr((sorted(tickers), start, end, interval, field))
+    cache_key = hashlib.md5(key.encode()).hexdigest()
+    return CHUNK_CACHE_DIR / f"eikon_{cache_key}.parquet"
+
+
+def _fetch_chunk(tickers, fields, start, end, interval, use_cache=True):
+    """
+    Fetch `fields` for one time chunk; returns {field: wide frame (Date x ticker)}.
+    A single field comes back wide (one column per RIC); several fields share
+    one normalized request that is pivoted per field. Cached per field, so
+    split and combined requests reuse each other's chunks.
+    """
+    # Chunks reaching today may still be incomplete, so never cache those
+    cacheable = use_cache and end < datetime.combine(date.today(), datetime.min.time())
+    cache_paths = {
+        f: _chunk_cache_path(tickers, f, start, end, interval) for f in fields
+    }
+
+    if cacheable and all(p.exists() for p in cache_paths.values()):
+        return {f: pd.read_parquet(p) for f, p in cache_paths.items()}
+
+    with _EIKON_SLOTS:
+        ts = ek.get_timeseries(
+            rics=tickers,
+            fields=fields[0] if len(fields) == 1 else list(fields),
+            start_date=start,
+            end_date=end,
+            interval=interval,
+            normalize=len(fields) > 1,
+            calendar="tradingdays",
+        )
+
+    if len(fields) == 1:
+        # With a single RIC, Eikon names the column after the field instead
+        if len(tickers) == 1:
+            ts.columns = list(tickers)
+        ts.columns.name = None
+        frames = {fields[0]: ts}
+    else:
+        # detect instrument column
+        inst_col_candidates = [
+            c for c in ts.columns if c.lower() not in ("date", "field", "value")
+        ]
+        if not inst_col_candidates:
+            raise KeyError(
+                f"Could not find instrument column in returned columns: {list(ts.columns)}"
+            )
+        inst_col = inst_col_candidates[0]
+        frames = {}
+        for f in fields:
+            frame = ts[ts["Field"] == f].pivot(
+                index="Date", columns=inst_col, values="Value"
+            )
+            frame.columns.name = None
+            frames[f] = frame
+
+    if cacheable:
+        CHUNK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for f, frame in frames.items():
+            # Write then rename so a crash never leaves a truncated cache hit
+            tmp_path = cache_paths[f].with_suffix(f".{threading.get_ident()}.tmp")
+            frame.to_parquet(tmp_path)
+            tmp_path.replace(cache_paths[f])
+    return frames
+
+
+def _concat_chunks(frames):
+    """Concat chronological chunks; only sort if the result isn't already sorted."""
+    out = pd.concat(frames, axis=0)
+    if not out.index.is_monotonic_increasing:
+        out = out.sort_index(kind="mergesort")
+    return out
+
+
 def fetch_prices_volumes(
-    tickers, start, end, interval="minute", fields=None, chunk_days=None
+    tickers,
+    start,
+    end,
+    interval="minute",
+    chunk_days=None,
+    max_workers=1,
+    use_cache=True,
 ):
     """
     Fetch CLOSE & VOLUME from Eikon with chunking, datetime inputs.
+    Chunks are aligned to a fixed chunk_days grid and clipped to the range.
+    Serially (the default) each chunk is one get_timeseries call for both
+    fields; with max_workers > 1 each (field, chunk) is its own call.
 
     Parameters
     ----------
@@ -85,60 +191,62 @@ def fetch_prices_volumes(
     start   : str | datetime | date
     end     : str | datetime | date | timedelta
     interval: str, default "minute"
-    fields  : list[str] or None
     chunk_days : int, default 30 for minute, 3650 for daily
+    max_workers : int, default 1
+        Threads used to fetch chunks. Opt-in only: eikon's shared desktop
+        session drives one asyncio loop and is not known to be thread-safe.
+        Requests in flight are also capped process-wide by
+        EIKON_MAX_CONCURRENT.
+    use_cache : bool, default True
+        Reuse raw chunks cached under CHUNK_CACHE_DIR; chunks ending today
+        or later are always re-fetched.
 
     Returns
     -------
     prices, volumes : pd.DataFrame, pd.DataFrame
     """
-    if fields is None:
-        fields = ["CLOSE", "VOLUME", "TIMESTAMP"]
-
-    start_dt, end_dt = _resolve_dates(start, end)
+    start_dt, end_dt = resolve_dates(start, end)
     if chunk_days is None:
         chunk_days = 30 if interval.lower() == "minute" else 3650
 
-    price_frames, volume_frames = [], []
     step = timedelta(minutes=1) if interval.lower() == "minute" else timedelta(days=1)
-    current_start = start_dt
-
-    while current_start < end_dt:
-        current_end = min(current_start + timedelta(days=chunk_days), end_dt)
-
-        ts = ek.get_timeseries(
-            rics=tickers,
-            fields=fields,
-            start_date=current_start,
-            end_date=current_end,
-            interval=interval,
-            normalize=True,
-            calendar="tradingdays",
-        )
+    # Chunks sit on a fixed grid of chunk_days cells counted from the epoch, so
+    # overlapping or widened requests hit the same cached chunks; the edge
+    # cells are fetched whole and the result is clipped to [start_dt, end_dt].
+    epoch = datetime(1970, 1, 1)
+    cell = timedelta(days=chunk_days)
+    current_start = epoch + cell * ((start_dt - epoch) // cell)
+    ranges = []
+    while current_start <= end_dt:
+        ranges.append((current_start, current_start + cell - step))
+        current_start += cell
 
-        # detect instrument column
-        inst_col_candidates = [
-            c for c in ts.columns if c.lower() not in ("date", "field", "value")
+    if max_workers > 1:
+        # One field per request, so both fields of a chunk can be in flight
+        jobs = [
+            ((field,), cs, ce) for field in ("CLOSE", "VOLUME") for cs, ce in ranges
         ]
-        if not inst_col_candidates:
-            raise KeyError(
-                f"Could not find instrument column in returned columns: {list(ts.columns)}"
-            )
-        inst_col = inst_col_candidates[0]
+    else:
+        # Serial: a single request per chunk carries both fields
+        jobs = [(("CLOSE", "VOLUME"), cs, ce) for cs, ce in ranges]
 
-        p = ts[ts["Field"] == "CLOSE"].pivot(
-            index="Date", columns=inst_col, values="Value"
-        )
-        v = ts[ts["Field"] == "VOLUME"].pivot(
-            index="Date", columns=inst_col, values="Value"
-        )
+    def _run(job):
+        fields, cs, ce = job
+        return _fetch_chunk(tickers, fields, cs, ce, interval, use_cache)
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            results = list(ex.map(_run, jobs))
+    else:
+        # Default: stay on the calling thread, one request at a time
+        results = [_run(job) for job in jobs]
 
-        price_frames.append(p)
-        volume_frames.append(v)
-        current_start = current_end + step
+    # Results are in job order: chunks are chronological and disjoint
+    price_frames = [r["CLOSE"] for r in results if "CLOSE" in r]
+    volume_frames = [r["VOLUME"] for r in results if "VOLUME" in r]
 
-    prices = pd.concat(price_frames, axis=0).sort_index()
-    volumes = pd.concat(volume_frames, axis=0).sort_index()
+    prices = _concat_chunks(price_frames).loc[start_dt:end_dt]
+    volumes = _concat_chunks(volume_frames).loc[start_dt:end_dt]
 
     wanted = [t for t in tickers if t in prices.columns]
     if wanted:
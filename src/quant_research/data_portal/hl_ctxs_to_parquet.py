@@ -1,41 +1,114 @@
+import os
 import re
-from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+import lz4.block
 import lz4.frame
-import pandas as pd
+import numpy as np
 import pyarrow as pa
 import pyarrow.compute as pc
+import pyarrow.csv as pv
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
 RAW_DIR = Path("data/hl_asset_ctxs_raw")
 PARQUET_DIR = Path("data/hl_assets_ctxs_parquet")
 PARQUET_DIR.mkdir(parents=True, exist_ok=True)
-COIN_DIR = Path("data/hl_assets_ctxs_by_coin")
+COIN_DIR = Path("data/hl_assets_ctxs_by_coin_month")
 COIN_DIR.mkdir(parents=True, exist_ok=True)
 
-
-def convert_parquets():
-    for f in sorted(RAW_DIR.glob("*.csv.lz4")):
-        # robust date extraction
-        m = re.match(r"^(\d{8})\.csv\.lz4$", f.name)
-        if not m:
-            print("skip (unexpected name):", f.name)
-            continue
-        date_str = m.group(1)
-
-        parquet_path = PARQUET_DIR / f"{date_str}.parquet"
-        if parquet_path.exists():
-            print("skip", parquet_path)
-            continue
-
-        with lz4.frame.open(f, "rb") as fin:
-            df = pd.read_csv(fin)
-
-        df["date"] = pd.to_datetime(date_str, format="%Y%m%d")
-        df.to_parquet(parquet_path, index=False)
-        print("wrote", parquet_path)
+# Raw daily files are named YYYYMMDD.csv.lz4
+_NAME_RE = re.compile(r"^(\d{8})\.csv\.lz4$")
+_DAILY_NAME_RE = re.compile(r"^(\d{4})(\d{2})\d{2}\.parquet$")
+_LZ4_FRAME_MAGIC = (0x184D2204).to_bytes(4, "little")
+# Max rows per row group in the daily Parquets
+RAW_ROW_GROUP_SIZE = 256_000
+
+
+def _read_lz4(f):
+    """Read and decompress a whole `.lz4` file (frame or raw block format)."""
+    raw = Path(f).read_bytes()
+    if raw[:4] == _LZ4_FRAME_MAGIC:
+        return lz4.frame.decompress(raw)
+    return lz4.block.decompress(raw)
+
+
+def _convert_one(f):
+    """Convert one raw `YYYYMMDD.csv.lz4` file to Parquet; returns the output path."""
+    # robust date extraction
+    m = _NAME_RE.match(f.name)
+    if m is None:
+        print("skip (unexpected name):", f.name)
+        return None
+    date_str = m.group(1)
+
+    parquet_path = PARQUET_DIR / f"{date_str}.parquet"
+    if parquet_path.exists():
+        print("skip", parquet_path)
+        return parquet_path
+
+    date_val = np.datetime64(datetime.strptime(date_str, "%Y%m%d").date(), "D")
+
+    # One-shot decompression (much faster than lz4.frame's streaming reader for
+    # per-day files), then stream the CSV parse + write block-wise
+    reader = pv.open_csv(
+        pa.BufferReader(_read_lz4(f)),
+        read_options=pv.ReadOptions(block_size=8 << 20),
+        convert_options=pv.ConvertOptions(
+            column_types=_RAW_CSV_TYPES, strings_can_be_null=True
+        ),
+    )
+    schema = reader.schema.append(pa.field("date", pa.date32()))
+    # Write to a temp file so an interrupted run doesn't leave a "done" file
+    tmp_path = parquet_path.with_suffix(".parquet.tmp")
+    # Statistics + page index let filtered scans skip row groups / pages
+    with pq.ParquetWriter(
+        tmp_path,
+        schema=schema,
+        compression="zstd",
+        use_dictionary=True,
+        write_statistics=True,
+        write_page_index=True,
+        data_page_size=1 << 20,
+    ) as writer:
+        # Buffer CSV blocks so row groups hold RAW_ROW_GROUP_SIZE rows rather
+        # than one (block-sized) group per batch
+        pending, n_pending = [], 0
+        for batch in reader:
+            date_col = pa.array(
+                np.full(batch.num_rows, date_val, dtype="datetime64[D]"),
+                type=pa.date32(),
+            )
+            pending.append(
+                pa.RecordBatch.from_arrays(batch.columns + [date_col], schema=schema)
+            )
+            n_pending += batch.num_rows
+            if n_pending >= RAW_ROW_GROUP_SIZE:
+                buf = pa.Table.from_batches(pending, schema=schema)
+                full = n_pending - n_pending % RAW_ROW_GROUP_SIZE
+                writer.write_table(
+                    buf.slice(0, full), row_group_size=RAW_ROW_GROUP_SIZE
+                )
+                pending, n_pending = buf.slice(full).to_batches(), n_pending - full
+        if n_pending:
+            writer.write_table(
+                pa.Table.from_batches(pending, schema=schema),
+                row_group_size=RAW_ROW_GROUP_SIZE,
+            )
+    tmp_path.replace(parquet_path)
+
+    print("wrote", parquet_path)
+    return parquet_path
+
+
+def convert_parquets(max_workers=None):
+    """Convert every raw file in RAW_DIR in parallel (one process per file)."""
+    files = sorted(RAW_DIR.glob("*.csv.lz4"))
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as ex:
+        return [p for p in ex.map(_convert_one, files, chunksize=4) if p is not None]
 
 
 # ---- Default target schema (adjust types if your source differs) ----
@@ -57,27 +130,62 @@ DEFAULT_SCHEMA = pa.schema(
     ]
 )
 
+# Fixed types for the raw CSV columns: the block-wise reader would otherwise
+# infer from the first block only (e.g. all-null or int-looking '0' columns)
+# and fail on the first float further down the file
+_RAW_CSV_TYPES = {
+    field.name: pa.string() if field.name in ("time", "coin") else pa.float64()
+    for field in DEFAULT_SCHEMA
+    if field.name != "date"
+}
+
+
+_TS_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M",
+)
+_TZ_SUFFIX = r"(Z|[+-]\d{2}:\d{2})$"
+
+
+def _guess_ts_format(sample):
+    """Pick the _TS_FORMATS entry matching one (tz-stripped) sample string."""
+    has_t = "T" in sample
+    has_secs = len(sample) >= 19
+    for fmt in _TS_FORMATS:
+        if ("T" in fmt) == has_t and fmt.endswith("%S") == has_secs:
+            return fmt
+
 
 def _parse_timestamp_ns_from_str(arr):
     """
     Parse common ISO 8601 variants to timestamp[ns].
-    Handles trailing 'Z' and ±HH:MM offsets by stripping them first,
-    then tries multiple formats and coalesces.
+    Handles trailing 'Z' and ±HH:MM offsets by stripping them first.
+    Homogeneous columns are parsed with one format guessed from the first
+    value; mixed columns fall back to trying every format and coalescing.
     """
     s = arr
     # Ensure string
     if not pa.types.is_string(s.type):
         return s  # not string; let caller handle
     # Strip trailing 'Z' and numeric tz offsets like +00:00 or -05:30
-    s = pc.replace_substring_regex(s, pattern=r"Z$", replacement="")
-    s = pc.replace_substring_regex(s, pattern=r"[+-]\d{2}:\d{2}$", replacement="")
+    if pc.any(pc.match_substring_regex(s, _TZ_SUFFIX)).as_py():
+        s = pc.replace_substring_regex(s, pattern=_TZ_SUFFIX, replacement="")
+
+    # Fast path: one strptime pass if every value matches the first one's layout
+    sample = pc.drop_null(s).slice(0, 1).to_pylist()
+    if sample:
+        fmt = _guess_ts_format(sample[0])
+        ts = pc.strptime(s, format=fmt, unit="ns", error_is_null=True)
+        if ts.null_count == s.null_count:
+            return ts
 
     # Try multiple layouts (seconds / no-seconds, 'T' or space)
-    ts1 = pc.strptime(s, format="%Y-%m-%dT%H:%M:%S", unit="ns", error_is_null=True)
-    ts2 = pc.strptime(s, format="%Y-%m-%d %H:%M:%S", unit="ns", error_is_null=True)
-    ts3 = pc.strptime(s, format="%Y-%m-%dT%H:%M", unit="ns", error_is_null=True)
-    ts4 = pc.strptime(s, format="%Y-%m-%d %H:%M", unit="ns", error_is_null=True)
-    return pc.coalesce(ts1, ts2, ts3, ts4)  # first non-null per row
+    parsed = [
+        pc.strptime(s, format=fmt, unit="ns", error_is_null=True) for fmt in _TS_FORMATS
+    ]
+    return pc.coalesce(*parsed)  # first non-null per row
 
 
 def _parse_date32_from_str(arr):
@@ -96,13 +204,26 @@ def _parse_date32_from_str(arr):
 
 
 def _cast_to_schema(tbl, target_schema):
-    cols = []
+    """Cast a Table or RecordBatch to `target_schema`; returns the same kind."""
+    build = type(tbl).from_arrays
     names = set(tbl.schema.names)
 
+    # Fast path (steady state): every target column already has the right type
+    if all(
+        field.name in names and tbl.schema.field(field.name).type.equals(field.type)
+        for field in target_schema
+    ):
+        return build([tbl[field.name] for field in target_schema], schema=target_schema)
+
+    cols = []
     for field in target_schema:
         if field.name in names:
             col = tbl[field.name]
 
+            if col.type.equals(field.type):
+                cols.append(col)
+                continue
+
             # Special-case time/date parsing from strings
             if pa.types.is_timestamp(field.type):
                 # If col is string or tz-aware timestamp, normalize to timestamp[ns]
@@ -123,21 +244,20 @@ def _cast_to_schema(tbl, target_schema):
 
             else:
                 # Generic numeric/string casts
-                if not col.type.equals(field.type):
-                    try:
-                        col = pc.cast(col, field.type)
-                    except Exception:
-                        valid = pc.is_valid(col)
-                        col = pc.cast(
-                            pc.if_else(valid, col, pa.nulls(len(col), type=field.type)),
-                            field.type,
-                        )
+                try:
+                    col = pc.cast(col, field.type)
+                except Exception:
+                    valid = pc.is_valid(col)
+                    col = pc.cast(
+                        pc.if_else(valid, col, pa.nulls(len(col), type=field.type)),
+                        field.type,
+                    )
 
             cols.append(col)
         else:
             cols.append(pa.nulls(tbl.num_rows, type=field.type))
 
-    return pa.Table.from_arrays(cols, schema=target_schema)
+    return build(cols, schema=target_schema)
 
 
 def _month_str(arr):
@@ -145,20 +265,60 @@ def _month_str(arr):
     return pc.strftime(ts, format="%Y-%m")
 
 
+def _month_key(tbl):
+    """Return the 'YYYY-MM' partition column for `tbl`."""
+    # Month extraction — prefer 'date'; fall back to 'time' if needed
+    base_date = tbl["date"]
+    if (
+        not pa.types.is_date32(base_date.type)
+        and not pc.any(pc.is_valid(base_date)).as_py()
+    ):
+        base_date = tbl["time"]  # in case date missing; still yields YYYY-MM
+    return _month_str(base_date)
+
+
 def split_asset_ctxs_by_coin_month(
     in_dir,
     out_dir,
     file_glob="*.parquet",
     compression="zstd",
-    row_group_size=1_000_000,
+    row_group_size=100_000,
     target_schema=DEFAULT_SCHEMA,
     overwrite=True,
-    max_open_writers=64,
+    max_open_writers=1024,
+    n_workers=None,
 ):
+    """
+    Repartition the daily asset-ctx Parquets into a Hive-style dataset:
+    `out_dir/coin=COIN/month=YYYY-MM/part-*.parquet`.
+
+    Read it back with `ds.dataset(out_dir, partitioning="hive")`.
+    Rows are staged per partition until `row_group_size` rows are available
+    or the partition is closed. Daily inputs (`YYYYMMDD.parquet`) are written
+    one month per `write_dataset` call, which closes that month's partitions,
+    so staged rows peak at roughly one month of input. If any input file is
+    named otherwise, everything goes through a single call and staging is
+    bounded only by the input size.
+    overwrite=True replaces the partitions being written; overwrite=False
+    raises if `out_dir` already holds data.
+    The previous `out_dir/COIN/YYYY-MM.parquet` layout is not overwritten in
+    place: an `out_dir` still holding such files is refused, so write to a
+    fresh directory (or delete the old one) when migrating.
+    Returns a dict of rows written per (coin, 'YYYY-MM').
+    """
     in_dir = Path(in_dir).expanduser()
     out_dir = Path(out_dir).expanduser()
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    legacy = [
+        p for p in out_dir.glob("*/*.parquet") if not p.parent.name.startswith("coin=")
+    ]
+    if legacy:
+        raise ValueError(
+            f"{out_dir} holds files in the old COIN/YYYY-MM.parquet layout "
+            f"(e.g. {legacy[0]}); write to a new directory or remove them first."
+        )
+
     # Expand the glob ourselves (PyArrow doesn't)
     files = sorted((in_dir).glob(file_glob))
     if not in_dir.exists():
@@ -171,96 +331,109 @@ def split_asset_ctxs_by_coin_month(
             f"- Tip: verify the folder name and try file_glob='**/*.parquet' if nested."
         )
 
-    dataset = ds.dataset([str(p) for p in files], format="parquet")
-
-    #  FILTER IN THE SCAN (Expression API)
-    filt = (ds.field("coin").is_valid()) & (ds.field("time").is_valid())
-    scanner = dataset.scanner(columns=target_schema.names, filter=filt)
-
-    # LRU cache: (coin, 'YYYY-MM') -> ParquetWriter
-    writers = OrderedDict()
+    # Daily files are date-ordered: one write per month closes its partitions
+    # (and frees their staged rows) before the next month is scanned
+    names = [_DAILY_NAME_RE.match(p.name) for p in files]
+    if all(names):
+        groups = {}
+        for p, m in zip(files, names):
+            groups.setdefault(f"{m.group(1)}-{m.group(2)}", []).append(p)
+        file_groups = [groups[k] for k in sorted(groups)]
+    else:
+        file_groups = [files]
+
+    out_schema = target_schema.append(pa.field("month", pa.string()))
+    partitioning = ds.partitioning(
+        pa.schema([("coin", pa.string()), ("month", pa.string())]), flavor="hive"
+    )
     counts = {}
-
-    def _writer_for(coin, yyyymm):
-        key = (coin, yyyymm)
-        # touch if present
-        if key in writers:
-            writers.move_to_end(key)
-            return writers[key]
-
-        coin_dir = out_dir / coin
-        coin_dir.mkdir(parents=True, exist_ok=True)
-        out_path = coin_dir / f"{yyyymm}.parquet"
-
-        if overwrite and out_path.exists():
-            out_path.unlink()
-
-        # If at capacity, close least-recently-used writer
-        if len(writers) >= max_open_writers:
-            old_key, old_writer = writers.popitem(last=False)  # LRU
-            try:
-                old_writer.close()
-            except Exception:
-                pass  # keep going
-
-        w = pq.ParquetWriter(
-            where=str(out_path),
-            schema=target_schema,
-            compression=compression,
-            use_dictionary=True,
+    n_workers = n_workers or os.cpu_count() or 1
+
+    def _prepare(rec_batch):
+        # Normalize schema (handles drift / missing cols)
+        batch = _cast_to_schema(rec_batch, target_schema)
+        months = _month_key(batch)
+        batch = batch.append_column("month", months).filter(pc.is_valid(months))
+        # group_by is Table-only; wrapping a single batch is zero-copy
+        per_key = (
+            pa.Table.from_batches([batch])
+            .group_by(["coin", "month"])
+            .aggregate([("coin", "count")])
+        )
+        return batch, per_key
+
+    def _count(per_key):
+        for coin, m, n in zip(
+            per_key["coin"].to_pylist(),
+            per_key["month"].to_pylist(),
+            per_key["coin_count"].to_pylist(),
+        ):
+            counts[(coin, m)] = counts.get((coin, m), 0) + n
+
+    def _batches(group):
+        dataset = ds.dataset([str(p) for p in group], format="parquet")
+        # Scan batches of row_group_size rows (each is later split across coin x
+        # month partitions); bounded readahead caps RAM while still overlapping
+        # I/O + decompression across files
+        scanner = dataset.scanner(
+            # Missing columns are null-filled by _cast_to_schema, not scanned
+            columns=[n for n in target_schema.names if n in dataset.schema.names],
+            filter=(ds.field("coin").is_valid()) & (ds.field("time").is_valid()),
+            batch_size=row_group_size,
+            batch_readahead=2,
+            fragment_readahead=4,
+            fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=True),
+            use_threads=True,
+        )
+        # Arrow kernels release the GIL, so batches are normalized on a thread
+        # pool; a bounded window of in-flight batches caps memory.
+        with ThreadPoolExecutor(max_workers=n_workers) as ex:
+            pending = deque()
+            for rec_batch in scanner.to_batches():
+                pending.append(ex.submit(_prepare, rec_batch))
+                if len(pending) >= 2 * n_workers:
+                    batch, per_key = pending.popleft().result()
+                    _count(per_key)
+                    yield batch
+            while pending:
+                batch, per_key = pending.popleft().result()
+                _count(per_key)
+                yield batch
+
+    # ~100k-row groups + page index keep selective reads cheap; 'coin' and
+    # 'month' live in the partition path, not in the file columns.
+    file_options = ds.ParquetFileFormat().make_write_options(
+        compression=compression,
+        compression_level=3 if compression == "zstd" else None,
+        use_dictionary=True,
+        write_statistics=True,
+        write_page_index=True,
+        data_page_size=1 << 20,
+    )
+    for i, group in enumerate(file_groups):
+        if overwrite:
+            behavior = "delete_matching"
+        else:
+            # Without overwrite, refuse to touch a non-empty out_dir; later
+            # months add files of their own next to the first month's
+            behavior = "error" if i == 0 else "overwrite_or_ignore"
+        ds.write_dataset(
+            _batches(group),
+            base_dir=str(out_dir),
+            basename_template=f"part-{i}-{{i}}.parquet",
+            schema=out_schema,
+            format="parquet",
+            partitioning=partitioning,
+            existing_data_behavior=behavior,
+            file_options=file_options,
+            # Each batch holds only a slice per partition; stage rows until a
+            # full group is available instead of flushing one tiny group per slice
+            min_rows_per_group=row_group_size,
+            max_rows_per_group=row_group_size,
+            max_open_files=max_open_writers,
+            # A threaded writer may reorder rows; keep each file in scan (time) order
+            use_threads=False,
         )
-        writers[key] = w
-        return w
-
-    try:
-        for rec_batch in scanner.to_batches():
-            tbl = pa.Table.from_batches([rec_batch])
-
-            # Normalize schema (handles drift / missing cols)
-            tbl = _cast_to_schema(tbl, target_schema)
-            if tbl.num_rows == 0:
-                continue
-
-            # Group by coin first
-            coins = pc.unique(tbl["coin"]).to_pylist()
-            for coin in coins:
-                c_tbl = tbl.filter(pc.equal(tbl["coin"], pa.scalar(coin)))
-                if c_tbl.num_rows == 0:
-                    continue
-
-                # Month extraction — prefer 'date'; fall back to 'time' if needed
-                base_date = c_tbl["date"]
-                if (
-                    not pa.types.is_date32(base_date.type)
-                    and not pc.any(pc.is_valid(base_date)).as_py()
-                ):
-                    base_date = c_tbl[
-                        "time"
-                    ]  # in case date missing; still yields YYYY-MM
-                months = _month_str(base_date)
-                uniq_months = pc.unique(months).to_pylist()
-
-                for m in uniq_months:
-                    m_mask = pc.equal(months, pa.scalar(m))
-                    cm_tbl = c_tbl.filter(m_mask)
-                    if cm_tbl.num_rows == 0:
-                        continue
-
-                    writer = _writer_for(coin, m)
-                    if cm_tbl.num_rows > row_group_size:
-                        for start in range(0, cm_tbl.num_rows, row_group_size):
-                            writer.write_table(cm_tbl.slice(start, row_group_size))
-                    else:
-                        writer.write_table(cm_tbl)
-
-                    counts[(coin, m)] = counts.get((coin, m), 0) + cm_tbl.num_rows
-    finally:
-        # Close any remaining open writers
-        for w in list(writers.values()):
-            try:
-                w.close()
-            except Exception:
-                pass
 
     return counts
 
@@ -283,32 +456,36 @@ def split_asset_ctxs_by_coin_single(
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    dataset = ds.dataset(str(in_dir / file_glob), format="parquet")
-    scanner = ds.Scanner(dataset=dataset, columns=target_schema.names)
+    # Expand the glob ourselves (PyArrow doesn't)
+    files = sorted(in_dir.glob(file_glob))
+    dataset = ds.dataset([str(p) for p in files], format="parquet")
+    scanner = dataset.scanner(
+        columns=[n for n in target_schema.names if n in dataset.schema.names]
+    )
 
-    tables_by_coin = {}
+    batches_by_coin = {}
 
     for rec_batch in scanner.to_batches():
-        tbl = pa.Table.from_batches([rec_batch])
-
-        mask = pc.scalar(True)
+        mask = pa.scalar(True)
         for col in required_non_null:
-            mask = pc.and_(mask, pc.is_valid(tbl[col]))
-        tbl = tbl.filter(mask)
-        if tbl.num_rows == 0:
+            mask = pc.and_(mask, pc.is_valid(rec_batch[col]))
+        batch = rec_batch.filter(mask)
+        if batch.num_rows == 0:
             continue
 
-        tbl = _cast_to_schema(tbl, target_schema)
+        batch = _cast_to_schema(batch, target_schema)
 
-        coins = pc.unique(tbl["coin"]).to_pylist()
+        coins = pc.unique(batch["coin"]).to_pylist()
         for coin in coins:
-            c_tbl = tbl.filter(pc.equal(tbl["coin"], pa.scalar(coin)))
-            if c_tbl.num_rows == 0:
+            c_batch = batch.filter(pc.equal(batch["coin"], pa.scalar(coin)))
+            if c_batch.num_rows == 0:
                 continue
-            tables_by_coin.setdefault(coin, []).append(c_tbl)
+            batches_by_coin.setdefault(coin, []).append(c_batch)
 
-    for coin, parts in tables_by_coin.items():
-        coin_tbl = pa.concat_tables(parts, promote=True)
+    for coin, batches in batches_by_coin.items():
+        # One contiguous buffer per column: fewer tiny chunks for the writer to
+        # walk and better dictionary/RLE runs
+        coin_tbl = pa.Table.from_batches(batches, schema=target_schema).combine_chunks()
         out_path = out_dir / f"{coin}.parquet"
         if overwrite and out_path.exists():
             out_path.unlink()
@@ -3,7 +3,7 @@ from pathlib import Path
 
 import pandas as pd
 
-from quant_research.data_portal.eikon_loader import fetch_prices_volumes
+from quant_research.data_portal.eikon_loader import fetch_prices_volumes, resolve_dates
 from quant_research.processing.clean_intraday import clean_to_rth
 
 # Base directories
@@ -38,6 +38,8 @@ def load_or_fetch_processed(
     tickers, start, end, interval="minute", force_refresh=False, save_raw=False
 ):
     prices_dict, volumes_dict = {}, {}
+    # Parse once; fetch_prices_volumes takes the datetime fast path per ticker
+    start_dt, end_dt = resolve_dates(start, end)
 
     for ticker in tickers:
         p_path = _processed_path(ticker, start, end)
@@ -54,7 +56,7 @@ def load_or_fetch_processed(
 
         # Fetch raw
         raw_prices, raw_volumes = fetch_prices_volumes(
-            [ticker], start=start, end=end, interval=interval
+            [ticker], start=start_dt, end=end_dt, interval=interval
         )
 
         if save_raw:
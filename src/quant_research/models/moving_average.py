@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from numba import njit
 
 
 def to_daily_close(series):
@@ -7,13 +8,60 @@ def to_daily_close(series):
     Convert an intraday price series to daily close.
     If already daily, returns unchanged.
     """
-    if isinstance(series.index, pd.DatetimeIndex):
-        # Detect intraday by presence of non-midnight times
-        if (series.index.time != pd.to_datetime(series.index.date).time).any():
+    idx = series.index
+    if isinstance(idx, pd.DatetimeIndex):
+        # Detect intraday by presence of non-midnight (wall-clock) times
+        wall = idx.tz_localize(None) if idx.tz is not None else idx
+        ticks_per_day = np.timedelta64(1, "D") // np.timedelta64(1, wall.unit)
+        if (wall.asi8 % ticks_per_day != 0).any():
             return series.resample("1D").last().dropna()
     return series
 
 
+@njit(cache=True)
+def _ma_xover(px, fast, slow):
+    """
+    Fused single pass over `px`: running-sum fast/slow MAs plus the signal.
+    A window containing NaN yields NaN (like rolling(min_periods=window)).
+    """
+    n = px.shape[0]
+    sig = np.zeros(n)
+    fast_ma = np.full(n, np.nan)
+    slow_ma = np.full(n, np.nan)
+    acc_f = 0.0
+    acc_s = 0.0
+    nan_f = 0
+    nan_s = 0
+    for i in range(n):
+        x = px[i]
+        if np.isnan(x):
+            nan_f += 1
+            nan_s += 1
+        else:
+            acc_f += x
+            acc_s += x
+        if i >= fast:
+            old = px[i - fast]
+            if np.isnan(old):
+                nan_f -= 1
+            else:
+                acc_f -= old
+        if i >= slow:
+            old = px[i - slow]
+            if np.isnan(old):
+                nan_s -= 1
+            else:
+                acc_s -= old
+        if i + 1 >= fast and nan_f == 0:
+            fast_ma[i] = acc_f / fast
+        if i + 1 >= slow and nan_s == 0:
+            slow_ma[i] = acc_s / slow
+        # Avoid positions before MAs are ready
+        if not (np.isnan(fast_ma[i]) or np.isnan(slow_ma[i])):
+            sig[i] = 1.0 if fast_ma[i] > slow_ma[i] else -1.0
+    return sig, fast_ma, slow_ma
+
+
 def ma_crossover_signal(price, fast=50, slow=200, resample_to_daily=True):
     """
     Generate MA crossover signal.
@@ -31,12 +79,11 @@ def ma_crossover_signal(price, fast=50, slow=200, resample_to_daily=True):
     else:
         price_daily = price
 
-    fast_ma = price_daily.rolling(fast, min_periods=fast).mean()
-    slow_ma = price_daily.rolling(slow, min_periods=slow).mean()
-
-    sig = np.where(fast_ma > slow_ma, 1, -1)
-    signal = pd.Series(sig, index=price_daily.index).astype(float)
+    arr = price_daily.to_numpy(dtype=np.float64, copy=False)
+    sig, fast_ma_arr, slow_ma_arr = _ma_xover(arr, fast, slow)
 
-    # Avoid positions before MAs are ready
-    signal[(fast_ma.isna()) | (slow_ma.isna())] = 0.0
+    index = price_daily.index
+    signal = pd.Series(sig, index=index)
+    fast_ma = pd.Series(fast_ma_arr, index=index)
+    slow_ma = pd.Series(slow_ma_arr, index=index)
     return signal, price_daily, fast_ma, slow_ma
@@ -6,8 +6,26 @@ Usage:
     prices_rth, volumes_rth = clean_to_rth(prices, volumes)
 """
 
+import numpy as np
 import pandas as pd
 
+RTH_START = np.timedelta64(9 * 3600 + 30 * 60, "s")
+RTH_END = np.timedelta64(16 * 3600, "s")
+
+
+def _rth_mask(index, include_close_bar=True):
+    """
+    Boolean mask of weekday bars within RTH for a tz-aware DatetimeIndex.
+    Time of day is taken from the int64 wall-clock values in one vectorized
+    pass (replaces between_time).
+    """
+    wall = index.tz_localize(None)
+    tick = np.timedelta64(1, wall.unit)
+    tod = wall.asi8 % (np.timedelta64(1, "D") // tick)
+    start, end = RTH_START // tick, RTH_END // tick
+    in_hours = (tod >= start) & ((tod <= end) if include_close_bar else (tod < end))
+    return in_hours & (index.dayofweek < 5)
+
 
 def clean_to_rth(prices, volumes, tz="America/New_York", include_close_bar=True):
     """
@@ -35,22 +53,14 @@ def clean_to_rth(prices, volumes, tz="America/New_York", include_close_bar=True)
     prices = _ensure_tz(prices).sort_index()
     volumes = _ensure_tz(volumes).sort_index()
 
-    # Weekdays only
-    prices = prices[prices.index.dayofweek < 5]
-    volumes = volumes[volumes.index.dayofweek < 5]
-
-    # Filter by time of day
-    start_s = "09:30"
-    end_s = "16:00"
-    inclusive = "both" if include_close_bar else "left"
-
-    prices_rth = prices.between_time(start_s, end_s, inclusive=inclusive)
-    volumes_rth = volumes.between_time(start_s, end_s, inclusive=inclusive)
+    # Weekdays only, 09:30 to 16:00 (local wall clock)
+    prices_rth = prices[_rth_mask(prices.index, include_close_bar)]
+    volumes_rth = volumes[_rth_mask(volumes.index, include_close_bar)]
 
     # Align and drop rows where both price & volume are NaN
-    idx = prices_rth.index.union(volumes_rth.index)
-    prices_rth = prices_rth.reindex(idx)
-    volumes_rth = volumes_rth.reindex(idx)
+    prices_rth, volumes_rth = prices_rth.align(
+        volumes_rth, join="outer", axis=0, copy=False
+    )
 
     mask = ~(prices_rth.isna().all(axis=1) & volumes_rth.isna().all(axis=1))
     return prices_rth.loc[mask], volumes_rth.loc[mask]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_research.processing.clean_intraday import _rth_mask, clean_to_rth
+
+
+def _reference_mask(index, include_close_bar):
+    """Weekday filter + between_time, as _rth_mask replaced."""
+    inclusive = "both" if include_close_bar else "left"
+    frame = pd.DataFrame({"x": np.arange(len(index))}, index=index)
+    weekdays = frame[index.dayofweek < 5]
+    kept = weekdays.between_time("09:30", "16:00", inclusive=inclusive)
+    return np.isin(frame["x"].to_numpy(), kept["x"].to_numpy())
+
+
+# Windows around the 2024 US spring-forward and fall-back transitions
+DST_RANGES = [("2024-03-07", "2024-03-13"), ("2024-10-30", "2024-11-06")]
+
+
+@pytest.mark.parametrize("start,end", DST_RANGES)
+@pytest.mark.parametrize("include_close_bar", [True, False])
+@pytest.mark.parametrize("unit", ["ns", "s"])
+def test_rth_mask_matches_between_time_across_dst(start, end, include_close_bar, unit):
+    index = pd.date_range(start, end, freq="min", tz="UTC", unit=unit).tz_convert(
+        "America/New_York"
+    )
+    mask = _rth_mask(index, include_close_bar)
+    np.testing.assert_array_equal(mask, _reference_mask(index, include_close_bar))
+
+
+def _reference_clean(prices, volumes, tz="America/New_York", include_close_bar=True):
+    """The previous clean_to_rth (between_time + union/reindex)."""
+    prices = prices.tz_localize("UTC").tz_convert(tz).sort_index()
+    volumes = volumes.tz_localize("UTC").tz_convert(tz).sort_index()
+    prices = prices[prices.index.dayofweek < 5]
+    volumes = volumes[volumes.index.dayofweek < 5]
+    inclusive = "both" if include_close_bar else "left"
+    prices = prices.between_time("09:30", "16:00", inclusive=inclusive)
+    volumes = volumes.between_time("09:30", "16:00", inclusive=inclusive)
+    idx = prices.index.union(volumes.index)
+    prices, volumes = prices.reindex(idx), volumes.reindex(idx)
+    mask = ~(prices.isna().all(axis=1) & volumes.isna().all(axis=1))
+    return prices.loc[mask], volumes.loc[mask]
+
+
+@pytest.mark.parametrize("start,end", DST_RANGES)
+@pytest.mark.parametrize("include_close_bar", [True, False])
+def test_clean_to_rth_matches_previous_implementation(start, end, include_close_bar):
+    rng = np.random.default_rng(0)
+    idx = pd.date_range(start, end, freq="min")
+    prices = pd.DataFrame(rng.random((len(idx), 2)), index=idx, columns=["A", "B"])
+    volumes = prices * 100
+    # Misaligned gaps and all-NaN rows on both sides
+    prices = prices.drop(idx[600:900])
+    volumes = volumes.drop(idx[2000:2300])
+    prices.iloc[::7] = np.nan
+    volumes.iloc[::7] = np.nan
+
+    got = clean_to_rth(prices, volumes, include_close_bar=include_close_bar)
+    exp = _reference_clean(prices, volumes, include_close_bar=include_close_bar)
+    pd.testing.assert_frame_equal(got[0], exp[0])
+    pd.testing.assert_frame_equal(got[1], exp[1])
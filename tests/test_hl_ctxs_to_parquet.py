@@ -0,0 +1,126 @@
+import importlib
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture
+def h(tmp_path, monkeypatch):
+    # Importing the module creates its data/ folders relative to the cwd
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("quant_research.data_portal.hl_ctxs_to_parquet")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        # Homogeneous: one guessed format covers every value
+        ["2024-01-31T23:59:58Z", "2024-02-01T00:00:01Z", None],
+        ["2024-01-31 23:59:58+00:00", "2024-02-01 00:00:01-05:30"],
+        ["2024-01-31T23:59", "2024-02-01T00:00"],
+        # Mixed layouts: the guessed format misses some rows, so fall back
+        ["2024-01-31T23:59:58Z", "2024-02-01 00:00", None, "2024-02-01T00:00:01"],
+    ],
+)
+def test_parse_timestamp(h, values):
+    out = h._parse_timestamp_ns_from_str(pa.array(values, pa.string()))
+    expected = [
+        None if v is None else datetime.fromisoformat(v[:19].replace("T", " "))
+        for v in values
+    ]
+    assert out.type == pa.timestamp("ns")
+    assert out.to_pylist() == expected
+
+
+def test_cast_to_schema_casts_record_batch(h):
+    batch = pa.RecordBatch.from_pydict(
+        {
+            "time": ["2024-01-31T10:00:00Z", "2024-01-31 10:01"],
+            "coin": ["BTC", "ETH"],
+            "funding": [0.5, None],
+            "date": ["2024-01-31", "2024-01-31"],
+        }
+    )
+    out = h._cast_to_schema(batch, h.DEFAULT_SCHEMA)
+
+    assert isinstance(out, pa.RecordBatch)
+    assert out.schema.equals(h.DEFAULT_SCHEMA)
+    assert out["time"].to_pylist() == [
+        datetime(2024, 1, 31, 10, 0),
+        datetime(2024, 1, 31, 10, 1),
+    ]
+    assert out["funding"].to_pylist() == [0.5, None]
+    assert out["date"].to_pylist() == [date(2024, 1, 31)] * 2
+    # Columns absent from the input come back as nulls
+    assert out["open_interest"].null_count == 2
+
+
+def test_cast_to_schema_keeps_matching_record_batch(h):
+    schema = h.DEFAULT_SCHEMA
+    batch = pa.RecordBatch.from_arrays(
+        [pa.nulls(3, type=f.type) for f in schema], schema=schema
+    )
+    out = h._cast_to_schema(batch, schema)
+
+    assert isinstance(out, pa.RecordBatch)
+    assert out.equals(batch)
+    # Already-matching columns are passed through, not copied
+    for i in range(len(schema)):
+        assert [b and b.address for b in out.column(i).buffers()] == [
+            b and b.address for b in batch.column(i).buffers()
+        ]
+
+
+def _daily_table(day, coins):
+    start = datetime.combine(day, datetime.min.time())
+    n = 12
+    return pa.table(
+        {
+            "time": pa.array(
+                [start + timedelta(hours=2 * i) for i in range(n)], pa.timestamp("ns")
+            ),
+            "coin": pa.array([coins[i % len(coins)] for i in range(n)], pa.string()),
+            # float64 here exercises the cast down to float32
+            "mark_px": pa.array([float(i) for i in range(n)], pa.float64()),
+            "date": pa.array([day] * n, pa.date32()),
+        }
+    )
+
+
+def test_split_by_coin_month(h, tmp_path):
+    in_dir = tmp_path / "daily"
+    in_dir.mkdir()
+    # Two days straddling a month boundary; null coins are dropped
+    inputs = {}
+    for day in [date(2024, 1, 31), date(2024, 2, 1)]:
+        tbl = _daily_table(day, ["BTC", "ETH", None])
+        pq.write_table(tbl, in_dir / f"{day:%Y%m%d}.parquet")
+        inputs[f"{day:%Y-%m}"] = tbl
+
+    out_dir = tmp_path / "by_coin_month"
+    counts = h.split_asset_ctxs_by_coin_month(in_dir, out_dir, row_group_size=3)
+
+    assert counts == {
+        ("BTC", "2024-01"): 4,
+        ("ETH", "2024-01"): 4,
+        ("BTC", "2024-02"): 4,
+        ("ETH", "2024-02"): 4,
+    }
+
+    dataset = ds.dataset(out_dir, partitioning="hive")
+    assert dataset.count_rows() == sum(counts.values())
+    for (coin, month), n in counts.items():
+        src = inputs[month]
+        expected = src.filter(pc.equal(src["coin"], coin))
+        got = dataset.to_table(
+            filter=(ds.field("coin") == coin) & (ds.field("month") == month)
+        )
+        assert got.num_rows == n
+        # Rows keep their scan order within each partition
+        assert got["time"].to_pylist() == expected["time"].to_pylist()
+        assert got["mark_px"].type == pa.float32()
+        assert got["mark_px"].to_pylist() == expected["mark_px"].to_pylist()
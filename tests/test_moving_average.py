@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_research.models.moving_average import ma_crossover_signal
+
+
+def _reference(price, fast, slow):
+    """The pandas rolling-mean implementation _ma_xover replaced."""
+    fast_ma = price.rolling(fast, min_periods=fast).mean()
+    slow_ma = price.rolling(slow, min_periods=slow).mean()
+    signal = pd.Series(np.where(fast_ma > slow_ma, 1, -1), index=price.index)
+    signal = signal.astype(float)
+    signal[fast_ma.isna() | slow_ma.isna()] = 0.0
+    return signal, fast_ma, slow_ma
+
+
+@pytest.fixture
+def price():
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2020-01-01", periods=2_000, freq="D")
+    px = pd.Series(100 + rng.standard_normal(len(idx)).cumsum(), index=idx)
+    # Isolated NaN, a NaN run longer than the fast window, and a leading NaN
+    px.iloc[0] = np.nan
+    px.iloc[300] = np.nan
+    px.iloc[900:920] = np.nan
+    return px
+
+
+@pytest.mark.parametrize("fast,slow", [(5, 20), (10, 10), (50, 200), (1, 3)])
+def test_matches_pandas_rolling_with_nans(price, fast, slow):
+    signal, price_daily, fast_ma, slow_ma = ma_crossover_signal(
+        price, fast=fast, slow=slow, resample_to_daily=False
+    )
+    exp_signal, exp_fast, exp_slow = _reference(price, fast, slow)
+
+    assert price_daily is price
+    pd.testing.assert_series_equal(fast_ma, exp_fast, check_names=False)
+    pd.testing.assert_series_equal(slow_ma, exp_slow, check_names=False)
+    pd.testing.assert_series_equal(signal, exp_signal, check_names=False)
+
+
+def test_series_shorter_than_slow_window_is_flat(price):
+    signal, _, _, slow_ma = ma_crossover_signal(
+        price.iloc[:10], fast=2, slow=20, resample_to_daily=False
+    )
+    assert (signal == 0.0).all()
+    assert slow_ma.isna().all()